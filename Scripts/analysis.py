@@ -1,8 +1,26 @@
-import math
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 from scipy import stats
 
 
+@lru_cache(maxsize=32)
+def cached_rank(values):
+    '''
+    Rank data, assigning the average rank to ties.
+    Results are cached by content, so that the actual efficiencies are only ranked once
+    when they are compared with the predictions of several models.
+
+    :parameter values: raw bytes of a float64 array to rank.
+    :return: read-only array of ranks.
+    '''
+
+    rank = stats.rankdata(np.frombuffer(values))
+    rank.setflags(write=False)
+    return rank
+
+
 def spearman_ds(ds, actual_col, pred_col, p_value=False, nan_policy='omit'):
     '''
     Calculate Spearman correlation coefficient between actual and predicted efficiencies.
@@ -17,13 +35,83 @@ def spearman_ds(ds, actual_col, pred_col, p_value=False, nan_policy='omit'):
     :return: Spearman correlation coefficient (or a tuple of Spearman correlation coefficient and corresponding p-value).
     '''
 
-    Spearman, pval = stats.spearmanr(
-        ds.iloc[:, actual_col - 1], ds.iloc[:, pred_col - 1], nan_policy=nan_policy)
-    if p_value == False:
-        return Spearman
-    else:
+    actual = ds.iloc[:, actual_col - 1].to_numpy(dtype=float)
+    pred = ds.iloc[:, pred_col - 1].to_numpy(dtype=float)
+
+    if p_value == True:
+        Spearman, pval = stats.spearmanr(actual, pred, nan_policy=nan_policy)
         return Spearman, pval
 
+    # Handle NaN values according to nan_policy
+    nan = np.isnan(actual) | np.isnan(pred)
+    if nan.any():
+        if nan_policy == 'omit':
+            actual, pred = actual[~nan], pred[~nan]
+        elif nan_policy == 'raise':
+            raise ValueError('The input contains nan values')
+        else:
+            return np.nan
+
+    actual_rank = cached_rank(actual.tobytes())
+    pred_rank = stats.rankdata(pred)
+
+    # Without ties, use the closed-form expression based on rank differences
+    # (ranks are then a permutation of 1..n, the only case where their sum of squares is n(n+1)(2n+1)/6)
+    n = len(actual)
+    no_ties = n * (n + 1) * (2 * n + 1) / 6
+    if n > 1 and actual_rank @ actual_rank == no_ties and pred_rank @ pred_rank == no_ties:
+        d = actual_rank - pred_rank
+        return 1 - 6 * (d @ d) / (n * (n * n - 1))
+
+    # Otherwise, Spearman coefficient is the Pearson correlation between the ranks (skips the p-value calculation)
+    return np.corrcoef(actual_rank, pred_rank)[0, 1]
+
+
+# Logarithmic discount of the ranking positions (extended when a larger k is requested)
+discount_cache = np.empty(0)
+
+
+def log_discount(k):
+    '''
+    Calculate the logarithmic discount for the first k positions of a ranking.
+    The discount of the first k positions is a prefix of that of any larger k,
+    so a single array is kept and sliced (and doubled in size when it is too short).
+
+    :parameter k: number of positions.
+    :return: read-only array with the discount of each position.
+    '''
+
+    global discount_cache
+
+    if k > len(discount_cache):
+        size = max(k, 2 * len(discount_cache))
+        discount_cache = 1 / np.log2(np.arange(size) + 2)
+        discount_cache.setflags(write=False)
+
+    return discount_cache[:k]
+
+
+def argsort_nan_last(values, ascending=True):
+    '''
+    Find the indices that sort an array, placing NaN values last.
+    Ties are ordered as in pandas' sort_values, so that rankings (and nDCG scores) are reproducible.
+
+    :parameter values: array to sort.
+    :parameter ascending (default=True): If False, sort in descending order.
+    :return: array of sorting indices.
+    '''
+
+    nan = np.isnan(values)
+    index = np.flatnonzero(~nan)
+
+    if ascending == True:
+        order = index[np.argsort(values[index])]
+    else:
+        index = index[::-1]
+        order = index[np.argsort(values[index])][::-1]
+
+    return np.concatenate((order, np.flatnonzero(nan)))
+
 
 def ndcg_at_k(ds, k, actual_col, pred_col, bins=False, reverse=False, multiple=False):
     """
@@ -41,60 +129,49 @@ def ndcg_at_k(ds, k, actual_col, pred_col, bins=False, reverse=False, multiple=F
     :return: nDCG@k score (or a list of scores and indices if parameter multiple is True).
     """
 
+    actual = ds.iloc[:, actual_col-1]
+
     # Discrete relevance value
 
     if bins == True:
         quantile_list = [0.0, 0.20, 0.40, 0.60, 0.80, 1.0]
-        bins = ds.iloc[:, actual_col-1].quantile(quantile_list)
+        bins = actual.quantile(quantile_list)
         labels = [0, 1, 2, 3, 4]
-        ds['binned'] = pd.cut(ds.iloc[:, actual_col-1],
-                              bins, labels=labels, include_lowest=True)
-
-    # Reverse ordering (worst case)
-        if reverse == True:
-            ds_sort = ds.sort_values(by=ds.columns[actual_col-1])
-            y_pred = ds_sort['binned'].values
+        ds['binned'] = pd.cut(actual, bins, labels=labels, include_lowest=True)
 
-    # Ordering based on each model's predictions
-        else:
-            ds_sort = ds.sort_values(
-                by=ds.columns[pred_col-1], ascending=False)
-            y_pred = ds_sort['binned'].values
+        # Category codes equal the labels, except for missing efficiencies (code -1)
+        codes = ds['binned'].cat.codes.to_numpy()
+        relevance = np.where(codes == -1, np.nan, codes)
 
     # Actual relevance value
 
     else:
+        relevance = actual.to_numpy(dtype=float)
 
-        # Reverse ordering (worst case)
-        if reverse == True:
-            ds_sort = ds.sort_values(by=ds.columns[actual_col-1])
-            y_pred = ds_sort.iloc[:, actual_col-1].values
+    # Reverse ordering (worst case)
+    if reverse == True:
+        order = argsort_nan_last(actual.to_numpy(dtype=float))
 
     # Ordering based on each model's predictions
-        else:
-            ds_sort = ds.sort_values(
-                by=ds.columns[pred_col-1], ascending=False)
-            y_pred = ds_sort.iloc[:, actual_col-1].values
+    else:
+        order = argsort_nan_last(
+            ds.iloc[:, pred_col-1].to_numpy(dtype=float), ascending=False)
 
-    # Ideal ordering
-    Y_test = sorted(y_pred, reverse=True)
+    y_pred = relevance[order]
+
+    # Ideal ordering (descending, NaN values last)
+    Y_test = -np.sort(-y_pred)
 
     # Calculate nDCG@k
 
-    thr = []
-    score = []
+    thr = list(range(k))
+    discount = log_discount(k)
 
-    a = b = 0
-    for i in range(0, k):
-        a += y_pred[i]/math.log2(i+2)
-        b += Y_test[i] / math.log2(i + 2)
-        thr.append(i)
-        if not b:
-            score.append(0)
-        else:
-            score.append(a/b)
+    a = np.cumsum(y_pred[:k] * discount)
+    b = np.cumsum(Y_test[:k] * discount)
+    score = np.divide(a, b, out=np.zeros(k), where=b != 0)
 
     if multiple == True:
-        return score, thr
+        return score.tolist(), thr
     else:
         return score[-1]
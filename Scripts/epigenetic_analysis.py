@@ -14,28 +14,27 @@ def extract_identical_sequences(ds, dt):
     :return: dataframe with identical sequences, epigenetic features, and efficiencies.
     '''
 
-    a = ds['seq']
-    b = dt['seq']
-    ds['seq2'] = a.isin(b)
-    dt['seq2'] = b.isin(a)
+    cells = ds.merge(dt, on='seq', suffixes=(' Cell_1', ' Cell_2'))
 
-    ds = ds[ds['seq2'] == True]
-    dt = dt[dt['seq2'] == True]
+    Y = cells['Normalized efficacy Cell_1'].values
+    y = cells['Normalized efficacy Cell_2'].values
 
-    cell1 = ds.sort_values("seq").reset_index(drop=True)
-    cell2 = dt.sort_values("seq").reset_index(drop=True)
+    Y_class = cells['Efficacy Cell_1'].values
+    y_class = cells['Efficacy Cell_2'].values
 
-    Y = cell1['Normalized efficacy']
-    y = cell2['Normalized efficacy']
+    # Compute the difference once and reuse it for both errors
+    diff = np.subtract(Y, y)
+    abs_error = np.abs(diff)
+    sq_error = np.multiply(diff, diff)
 
-    Y_class = cell1['Efficacy']
-    y_class = cell2['Efficacy']
+    misclassification = np.subtract(Y_class, y_class)
+    np.abs(misclassification, out=misclassification)
 
     df = pd.DataFrame(
-        {'Sequence': cell1['seq'], 'CTCF Cell_1': cell1['ctcf'], 'DNase Cell_1': cell1['dnase'], 'H3K4me3 Cell_1': cell1['h3k4me3'], 'RRBS Cell_1': cell1['rrbs'],
-         'CTCF Cell_2': cell2['ctcf'], 'DNase Cell_2': cell2['dnase'], 'H3K4me3 Cell_2': cell2['h3k4me3'], 'RRBS Cell_2': cell2['rrbs'],
+        {'Sequence': cells['seq'], 'CTCF Cell_1': cells['ctcf Cell_1'], 'DNase Cell_1': cells['dnase Cell_1'], 'H3K4me3 Cell_1': cells['h3k4me3 Cell_1'], 'RRBS Cell_1': cells['rrbs Cell_1'],
+         'CTCF Cell_2': cells['ctcf Cell_2'], 'DNase Cell_2': cells['dnase Cell_2'], 'H3K4me3 Cell_2': cells['h3k4me3 Cell_2'], 'RRBS Cell_2': cells['rrbs Cell_2'],
          'Normalized Efficacy Cell_1': Y, 'Normalized Efficacy Cell_2': y, 'Efficacy Cell_1': Y_class, 'Efficacy Cell_2': y_class,
-         'Absolute Error': np.abs(Y-y), 'Squared Error': np.square(Y-y), 'Misclassification': np.abs(Y_class-y_class)}
+         'Absolute Error': abs_error, 'Squared Error': sq_error, 'Misclassification': misclassification}
     )
 
     return df
@@ -51,14 +50,17 @@ def pair_epigenetic_correlation(ds):
     :return: dataframe with the relevant sequences.
     '''
 
-    epi = ds[(ds.iloc[:, 1] != ds.iloc[:, 5]) |
-             (ds.iloc[:, 2] != ds.iloc[:, 6]) |
-             (ds.iloc[:, 3] != ds.iloc[:, 7]) |
-             (ds.iloc[:, 4] != ds.iloc[:, 8])]
+    # Compare the epigenetic features of the first cell (columns 2-5)
+    # with those of the second cell (columns 6-9)
+    features = ds.iloc[:, 1:9].to_numpy()
+    mask = (features[:, :4] != features[:, 4:]).any(axis=1)
+    epi = ds[mask]
 
-    spearman, _ = stats.spearmanr(epi.iloc[:, 9], epi.iloc[:, 10])
-    error = epi.iloc[:, 13]
-    mean = error.mean()
+    # Both efficiencies and absolute error (columns 10, 11 and 14)
+    values = epi.iloc[:, [9, 10, 13]].to_numpy(dtype=float)
+
+    spearman, _ = stats.spearmanr(values[:, 0], values[:, 1])
+    mean = np.nanmean(values[:, 2])
 
     print("Spearman correlation = %.3f" % (spearman))
     print("Mean absolute error = %.3f" % (mean))
@@ -76,15 +78,12 @@ def total_epigenetic_correlation(epi1, epi2, epi3):
     :return: Spearman correlation coefficient.
     '''
 
-    Y = np.concatenate(
-        (epi1.iloc[:, 9], epi2.iloc[:, 9], epi3.iloc[:, 9]), axis=0)
-    y = np.concatenate(
-        (epi1.iloc[:, 10], epi2.iloc[:, 10], epi3.iloc[:, 10]), axis=0)
+    # Stack both efficiencies and absolute error (columns 10, 11 and 14) of all datasets at once
+    values = np.concatenate(
+        [epi.iloc[:, [9, 10, 13]].to_numpy(dtype=float) for epi in (epi1, epi2, epi3)], axis=0)
 
-    error = np.concatenate(
-        (epi1.iloc[:, 13], epi2.iloc[:, 13], epi3.iloc[:, 13]), axis=0)
-    mean = error.mean()
-    spearman, _ = stats.spearmanr(Y, y)
+    mean = values[:, 2].mean()
+    spearman, _ = stats.spearmanr(values[:, 0], values[:, 1])
 
     print("Spearman correlation = %.3f" % (spearman))
     print("Mean absolute error = %.3f" % (mean))
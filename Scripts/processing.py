@@ -1,3 +1,9 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
 def most_common(lst):
     '''
     Find the most common value of a list.
@@ -6,45 +12,24 @@ def most_common(lst):
     :return: most common value.
     '''
 
-    return max(set(lst), key=lst.count)
+    return Counter(lst).most_common(1)[0][0]
 
 
 def find_pam(seq):
     '''
     Find the PAM index of a given column containing sequences.
 
-    :seq: column with sequences to analyse.
-    :return: PAM index (if all PAMs' indices match).
+    :seq: column (or list) with sequences to analyse.
+    :return: PAM index (most common index over all PAMs).
     '''
 
-    # Initialize lists of PAM indices
-    agg = tgg = cgg = ggg = []
-
     # Find indices for each PAM
-    for sequence in seq:
-        agg_index = sequence.find('AGG')
-        agg.append(agg_index)
-
-        tgg_index = sequence.find('TGG')
-        tgg.append(tgg_index)
-
-        cgg_index = sequence.find('CGG')
-        cgg.append(cgg_index)
-
-        ggg_index = sequence.find('GGG')
-        ggg.append(ggg_index)
-
-    # Remove not found (-1) values
-    agg_new = [x for x in agg if x != -1]
-    tgg_new = [x for x in tgg if x != -1]
-    cgg_new = [x for x in cgg if x != -1]
-    ggg_new = [x for x in ggg if x != -1]
+    seq = pd.Series(seq)
+    pam_indices = np.concatenate([seq.str.find(pam).to_numpy(dtype=np.int64)
+                                  for pam in ('AGG', 'TGG', 'CGG', 'GGG')])
 
-    # Find the most common index and check if it's the same for all PAMs
-    if most_common(agg_new) == most_common(tgg_new) == most_common(cgg_new) == most_common(ggg_new):
-        return most_common(agg_new)
-    else:
-        raise Exception('PAM indices are different')
+    # Remove not found (-1) values and find the most common index
+    return most_common(pam_indices[pam_indices != -1].tolist())
 
 
 def extract_koike_yusa(ds, seq_col=5, rep1_col=6, rep2_col=7):
@@ -97,29 +82,25 @@ def extract_haeussler(ds, data_name, data_col=1, seq_col=3, ext_seq_col=7, eff_c
     # Extract the relevant dataset by name ('doench2016_hg19', 'Hct116', '293T', 'doench2014-Mm', Hl60, 'shkumatava')
     ds_new = ds[ds.iloc[:, data_col-1].str.contains(data_name)]
 
-    # Initialize lists to obtain 23-nt and 30-nt sequences with their efficiencies
-    seq_23 = []
-    seq_30 = []
-    eff = []
-
-    # Iterate rows to find starting index and extract the appropriate sequences and their corresponding efficiencies
-    for _, row in ds_new.iterrows():
-        start_index = row.iloc[ext_seq_col-1].find(row.iloc[seq_col-1])
-        seq_23.append(row.iloc[ext_seq_col-1][start_index:start_index + 23])
-        seq_30.append(row.iloc[ext_seq_col-1][start_index-4:start_index + 26])
+    # Get the extended sequences, spacers and efficiencies
+    ext_seq = ds_new.iloc[:, ext_seq_col-1].to_numpy()
+    spacer = ds_new.iloc[:, seq_col-1].to_numpy()
+    eff = ds_new.iloc[:, eff_col-1].to_numpy()
 
-        # Inverse the sign of the knock-out efficiencies from Wang/Xu dataset (HL60) due to negative selection screening
-        if data_name == 'Hl60':
-            eff.append(-row.iloc[eff_col-1])
+    # Find starting index and extract the appropriate sequences
+    start_index = [ext.find(sp) for ext, sp in zip(ext_seq, spacer)]
+    seq_23 = [ext[i:i + 23] for ext, i in zip(ext_seq, start_index)]
+    seq_30 = [ext[i-4:i + 26] for ext, i in zip(ext_seq, start_index)]
 
-        # Convert percent value to decimal for Shkumatava dataset (Zebrafish) due to % indels induced at target sequence
-        elif data_name == 'shkumatava':
-            eff.append(row.iloc[eff_col - 1] / 100)
+    # Inverse the sign of the knock-out efficiencies from Wang/Xu dataset (HL60) due to negative selection screening
+    if data_name == 'Hl60':
+        eff = -eff
 
-        else:
-            eff.append(row.iloc[eff_col-1])
+    # Convert percent value to decimal for Shkumatava dataset (Zebrafish) due to % indels induced at target sequence
+    elif data_name == 'shkumatava':
+        eff = eff / 100
 
-    return seq_23, seq_30, eff
+    return seq_23, seq_30, eff.tolist()
 
 
 def extract_shalem(ds, seq_col=1, ext_seq_col=2, eff_col=12):
@@ -133,19 +114,17 @@ def extract_shalem(ds, seq_col=1, ext_seq_col=2, eff_col=12):
     :return: lists of 23-nt, 30-nt sequences and their efficiencies.
     '''
 
-    # Initialize lists to obtain 23-nt and 30-nt sequences with their efficiencies
-    seq_23 = []
-    seq_30 = []
-    eff = []
+    # Get the extended sequences, spacers and efficiencies
+    ext_seq = ds.iloc[:, ext_seq_col-1].to_numpy()
+    spacer = ds.iloc[:, seq_col-1].to_numpy()
+    eff = ds.iloc[:, eff_col-1].to_numpy()
 
-    # Iterate rows to find starting index and extract the appropriate sequences and their corresponding efficiencies
-    for _, row in ds.iterrows():
-        start_index = row.iloc[ext_seq_col-1].find(row.iloc[seq_col-1])
-        seq_23.append(row.iloc[ext_seq_col-1][start_index:start_index + 23])
-        seq_30.append(row.iloc[ext_seq_col-1][start_index-4:start_index + 26])
-        eff.append(row.iloc[eff_col-1])
+    # Find starting index and extract the appropriate sequences
+    start_index = [ext.find(sp) for ext, sp in zip(ext_seq, spacer)]
+    seq_23 = [ext[i:i + 23] for ext, i in zip(ext_seq, start_index)]
+    seq_30 = [ext[i-4:i + 26] for ext, i in zip(ext_seq, start_index)]
 
-    return seq_23, seq_30, eff
+    return seq_23, seq_30, eff.tolist()
 
 
 def rescale(ds, eff_col=1):
@@ -172,22 +151,19 @@ def csv_to_fasta(ds, length, seq_col=2):
     '''
 
     if length == 20:
-        fasta = open('E-CRISP.fasta', 'w+')
-
-        for index, row in ds.iterrows():
-            fasta.write('>Seq_' + str(index+1) + '\n' +
-                        row.iloc[seq_col-1][4:24] + '\n')
-
-        fasta.close()
+        filename = 'E-CRISP.fasta'
+        seq = [sequence[4:24] for sequence in ds.iloc[:, seq_col-1]]
 
     elif length == 30:
-        fasta = open('DeepCas9.fasta', 'w+')
-
-        for index, row in ds.iterrows():
-            fasta.write('>Seq_' + str(index+1) + '\n' +
-                        row.iloc[seq_col-1] + '\n')
-
-        fasta.close()
+        filename = 'DeepCas9.fasta'
+        seq = ds.iloc[:, seq_col-1].tolist()
 
     else:
         raise Exception('Length should be either 20 or 30 nucleotides.')
+
+    # Build the whole FASTA content and write it at once
+    content = ''.join([f'>Seq_{index+1}\n{sequence}\n'
+                       for index, sequence in zip(ds.index, seq)])
+
+    with open(filename, 'w+') as fasta:
+        fasta.write(content)
@@ -4,6 +4,14 @@ import pandas as pd
 from xgboost import XGBRegressor
 
 
+# Define universe of possible input values (Genetic code, 4 bases)
+dna_code = 'TACG'
+
+# Define a lookup table mapping each ASCII character to its one-hot vector
+lut = np.zeros((256, len(dna_code)), dtype=np.uint8)
+lut[np.frombuffer(dna_code.encode('ascii'), dtype=np.uint8), np.arange(len(dna_code))] = 1
+
+
 def encode(seq):
     '''
     Encode DNA sequences as a one-hot numeric array to be used for training.
@@ -12,24 +20,35 @@ def encode(seq):
     :return: one-hot-encoded array
     '''
 
-    # Define universe of possible input values (Genetic code, 4 bases)
-    dna_code = 'TACG'
+    onehot_encoded = lut[np.frombuffer(seq.encode('ascii'), dtype=np.uint8)]
+
+    # Characters other than T, A, C, G are mapped to all-zero rows
+    if not (onehot_encoded.sum(axis=-1) == 1).all():
+        raise Exception('Sequences should only contain T, A, C, G nucleotides.')
+
+    return onehot_encoded
 
-    # Define a mapping of DNA nucleotides to integers
-    char_to_int = dict((c, i) for i, c in enumerate(dna_code))
 
-    # Integer encode DNA sequence
-    int_encoded = [char_to_int[char] for char in seq]
+def encode_fixed30(seq):
+    '''
+    Encode multiple 30-nt DNA sequences at once as a one-hot numeric array to be used for training.
+
+    :parameter seq: sequences to encode (all of them 30-nt long).
+    :return: one-hot-encoded array of shape (number of sequences, 30, 4).
+    '''
+
+    # Check the length of every sequence, since joining them would otherwise misalign the positions
+    if (np.fromiter(map(len, seq), dtype=np.int64, count=len(seq)) != 30).any():
+        raise Exception('Sequences should be 30 nucleotides long.')
 
-    # One hot encode DNA sequence
-    onehot_encoded = []
+    seq = np.frombuffer(''.join(seq).encode('ascii'), dtype=np.uint8).reshape(-1, 30)
+    onehot_encoded = lut.take(seq, axis=0)
 
-    for value in int_encoded:
-        letter = [0 for _ in range(len(dna_code))]
-        letter[value] = 1
-        onehot_encoded.append(letter)
+    # Characters other than T, A, C, G are mapped to all-zero rows
+    if not (onehot_encoded.sum(axis=-1) == 1).all():
+        raise Exception('Sequences should only contain T, A, C, G nucleotides.')
 
-    return np.array(onehot_encoded)
+    return onehot_encoded
 
 
 def ohe_model(ds, seq_col=2, eff_col=3, transform=False, save=False):
@@ -46,11 +65,10 @@ def ohe_model(ds, seq_col=2, eff_col=3, transform=False, save=False):
     '''
 
     # Encode sequences and define features & labels
-    X = ds.iloc[:, seq_col-1].apply(encode)
-    X_new = np.stack(X)
-    X_train = X_new.reshape(X_new.shape[0], 120)
+    X = encode_fixed30(ds.iloc[:, seq_col-1].values)
+    X_train = X.reshape(X.shape[0], 120).astype(np.float32)
 
-    Y_train = ds.iloc[:, eff_col-1].values
+    Y_train = ds.iloc[:, eff_col-1].to_numpy(dtype=np.float32)
 
     # Square root transformation of efficiencies (only for Chari dataset)
     if transform == True: